@@ -5,6 +5,8 @@ Local Chatbot with Multi-File Q&A (TF-IDF) + SQLite Memory + Colored Output
 Commands:
   load <file>              - add a .txt/.md/.log (./, script dir, or ./docs)
   load folder <path>       - add all .txt/.md/.log in a folder
+                             (both accept --min-df=N / --max-df=F to prune terms
+                              index-wide, until 'clear docs')
   list docs                - show loaded files
   clear docs               - remove all indexed files
   ask <question>           - search with TF-IDF + cosine (min score: 0.05)
@@ -16,6 +18,7 @@ Commands:
   /memkeys                 - list saved memory keys
   /memsearch <text>        - search keys/values in memory
   /forget <key>            - delete a saved memory
+  /export                  - write memory + to-dos to data/*.json
 
   add <task>               - add a to-do
   list todos               - list to-dos
@@ -35,24 +38,39 @@ Tips:
   Set min match score:     python chatbot.py --min-score 0.1
 
 Notes:
-- Fully local. No external deps.
+- Fully local. No external deps (orjson is used if installed).
 - Index is in memory. Chunking is paragraph-aware (~600 chars).
-- Memory is persisted via SQLite (FTS5 for fast /memsearch).
+- Memory and to-dos are persisted via SQLite (FTS5 for fast /memsearch).
+  Old facts.json/todos.json are imported once; /export writes them back out.
 - Stopwords filtered from TF-IDF vectors for better match quality.
 """
 from __future__ import annotations
 
+import codecs
+import functools
+import heapq
+import io
 import json
 import math
 import os
 import random
 import re
-import sqlite3
 import sys
 import time
+from array import array
+from collections import Counter, OrderedDict
 from datetime import date, datetime
+from itertools import repeat
+from operator import mul, sub
 from pathlib import Path
-from typing import Callable, Dict, List, Optional, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from memory import MemoryStore
+
+try:  # optional fast JSON: pip install orjson
+    import orjson
+except ImportError:
+    orjson = None
 
 # ---------------- Paths ----------------
 ROOT = Path(__file__).resolve().parent
@@ -60,25 +78,19 @@ DATA_DIR = ROOT / "data"
 LOG_DIR = ROOT / "chat_logs"
 DOCS_DIR = ROOT / "docs"
 MEMORY_DB = DATA_DIR / "memory.db"
-TODO_FILE = DATA_DIR / "todos.json"
+FACTS_FILE = DATA_DIR / "facts.json"  # legacy import / /export target
+TODO_FILE = DATA_DIR / "todos.json"  # legacy import / /export target
 
 for _p in (DATA_DIR, LOG_DIR, DOCS_DIR):
     _p.mkdir(parents=True, exist_ok=True)
 
-if not TODO_FILE.exists():
-    TODO_FILE.write_text(json.dumps([], indent=2), encoding="utf-8")
-
 # ---------------- Utilities: storage, logging ----------------
-def _read_json(path: Path, default):
-    try:
-        return json.loads(path.read_text(encoding="utf-8"))
-    except (FileNotFoundError, json.JSONDecodeError):
-        return default
-
-
 def _write_json(path: Path, obj) -> None:
     tmp = path.with_suffix(".tmp")
-    tmp.write_text(json.dumps(obj, indent=2, ensure_ascii=False), encoding="utf-8")
+    if orjson is not None:
+        tmp.write_bytes(orjson.dumps(obj, option=orjson.OPT_INDENT_2))
+    else:
+        tmp.write_text(json.dumps(obj, indent=2, ensure_ascii=False), encoding="utf-8")
     tmp.replace(path)
 
 
@@ -93,94 +105,13 @@ def normalize_key(k: str) -> str:
     return re.sub(r"\s+", " ", k.strip().lower())
 
 
-# ---------------- Memory 2.0: SQLite + FTS5 ----------------
-SCHEMA = """
-CREATE TABLE IF NOT EXISTS memories (
-  key TEXT PRIMARY KEY,
-  value TEXT NOT NULL,
-  updated_at REAL NOT NULL
-);
-CREATE VIRTUAL TABLE IF NOT EXISTS memories_fts USING fts5(
-  key, value, content='memories', content_rowid='rowid'
-);
-CREATE TRIGGER IF NOT EXISTS memories_ai AFTER INSERT ON memories BEGIN
-  INSERT INTO memories_fts(rowid, key, value) VALUES (new.rowid, new.key, new.value);
-END;
-CREATE TRIGGER IF NOT EXISTS memories_ad AFTER DELETE ON memories BEGIN
-  INSERT INTO memories_fts(memories_fts, rowid, key, value) VALUES('delete', old.rowid, old.key, old.value);
-END;
-CREATE TRIGGER IF NOT EXISTS memories_au AFTER UPDATE ON memories BEGIN
-  INSERT INTO memories_fts(memories_fts, rowid, key, value) VALUES('delete', old.rowid, old.key, old.value);
-  INSERT INTO memories_fts(rowid, key, value) VALUES (new.rowid, new.key, new.value);
-END;
-"""
-
-
-class MemoryStore:
-    def __init__(self, db_path: Path = MEMORY_DB):
-        self.db_path = Path(db_path)
-        self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self.conn = sqlite3.connect(self.db_path)
-        self.conn.execute("PRAGMA journal_mode=WAL;")
-        self.conn.execute("PRAGMA foreign_keys=ON;")
-        self.conn.executescript(SCHEMA)
-        self.conn.commit()
-
-    def remember(self, key: str, value: str) -> None:
-        key = key.strip()
-        value = value.strip()
-        now = time.time()
-        self.conn.execute(
-            "INSERT INTO memories(key, value, updated_at) VALUES(?,?,?) "
-            "ON CONFLICT(key) DO UPDATE SET value=excluded.value, updated_at=excluded.updated_at",
-            (key, value, now),
-        )
-        self.conn.commit()
-
-    def recall(self, key: str) -> Optional[str]:
-        cur = self.conn.execute("SELECT value FROM memories WHERE key=?", (key.strip(),))
-        row = cur.fetchone()
-        return row[0] if row else None
-
-    def search(self, query: str, limit: int = 20) -> List[Tuple[str, str]]:
-        query = query.strip()
-        if not query:
-            return []
-        try:
-            cur = self.conn.execute(
-                "SELECT key, value FROM memories_fts WHERE memories_fts MATCH ? LIMIT ?",
-                (query, limit),
-            )
-            rows = cur.fetchall()
-            if rows:
-                return rows
-        except sqlite3.OperationalError:
-            pass
-        # Fallback LIKE search
-        cur = self.conn.execute(
-            "SELECT key, value FROM memories WHERE key LIKE ? OR value LIKE ? LIMIT ?",
-            (f"%{query}%", f"%{query}%", limit),
-        )
-        return cur.fetchall()
-
-    def forget(self, key: str) -> bool:
-        cur = self.conn.execute("DELETE FROM memories WHERE key=?", (key.strip(),))
-        self.conn.commit()
-        return cur.rowcount > 0
-
-    def keys(self, limit: int = 200) -> List[str]:
-        cur = self.conn.execute(
-            "SELECT key FROM memories ORDER BY updated_at DESC LIMIT ?", (limit,)
-        )
-        return [r[0] for r in cur.fetchall()]
-
-    def close(self) -> None:
-        self.conn.close()
-
-
 # ---------------- Q&A: tokenizer, chunking, vectors ----------------
 WORD_RE = re.compile(r"[A-Za-z0-9_]+")
+_PARA_RE = re.compile(r"\n\s*\n")
+_SENT_RE = re.compile(r"(?<=[.!?])\s+")
+_DF_OPT_RE = re.compile(r"\s+--(min-df|max-df)=(\S+)", re.I)
 ALLOWED_SUFFIX = {".txt", ".md", ".log"}
+READ_BLOCK = 1 << 16  # bytes per read when streaming documents
 
 # Common English stopwords to filter from TF-IDF vectors
 STOPWORDS = frozenset({
@@ -196,65 +127,287 @@ STOPWORDS = frozenset({
 
 def tokenize(text: str) -> List[str]:
     """Lowercase tokenize, filtering stopwords for better TF-IDF quality."""
-    return [
-        w.lower() for w in WORD_RE.findall(text)
-        if w.lower() not in STOPWORDS
-    ]
+    return [w for w in WORD_RE.findall(text.lower()) if w not in STOPWORDS]
 
 
-def split_chunks(text: str, max_chars: int = 600) -> List[str]:
-    paras = [p.strip() for p in re.split(r"\n\s*\n", text) if p.strip()]
-    chunks: List[str] = []
-    for p in paras:
-        if len(p) <= max_chars:
-            chunks.append(p)
+@functools.lru_cache(maxsize=1024)
+def _tokenize_cached(text: str) -> Tuple[str, ...]:
+    """tokenize() memoized for query text, which repeats across a session.
+
+    Not used for documents: their text is unique and would only fill the cache.
+    """
+    return tuple(tokenize(text))
+
+
+def _pack_sentences(cur: str, sentences: Iterable[str], max_chars: int, out: List[str]) -> str:
+    """Greedily pack sentences onto the open chunk ``cur``.
+
+    Full chunks are appended to ``out``; the new open chunk is returned.
+    """
+    for s in sentences:
+        if len(cur) + len(s) + 1 <= max_chars:
+            cur = (cur + " " + s).strip()
         else:
-            sent = re.split(r"(?<=[.!?])\s+", p)
-            cur = ""
-            for s in sent:
-                if len(cur) + len(s) + 1 <= max_chars:
-                    cur = (cur + " " + s).strip()
-                else:
-                    if cur:
-                        chunks.append(cur)
-                    cur = s
             if cur:
-                chunks.append(cur)
+                out.append(cur)
+            cur = s
+    return cur
+
+
+def _chunk_paragraph(p: str, max_chars: int) -> List[str]:
+    """Split one paragraph into chunks of at most ~max_chars on sentence ends."""
+    p = p.strip()
+    if not p:
+        return []
+    if len(p) <= max_chars:
+        return [p]
+    chunks: List[str] = []
+    cur = _pack_sentences("", _SENT_RE.split(p), max_chars, chunks)
+    if cur:
+        chunks.append(cur)
+    return chunks
+
+
+def _close_paragraph(cur: Optional[str], rest: str, max_chars: int) -> List[str]:
+    """Chunk the end of a paragraph, continuing ``cur`` if it was being packed."""
+    if cur is None:
+        return _chunk_paragraph(rest, max_chars)
+    chunks: List[str] = []
+    cur = _pack_sentences(cur, _SENT_RE.split(rest.rstrip()), max_chars, chunks)
+    if cur:
+        chunks.append(cur)
+    return chunks
+
+
+def split_chunks(text: str, max_chars: int = 600) -> List[str]:
+    """Split already-loaded text into chunks.
+
+    Ingestion streams files through ``iter_chunks`` instead; this is kept as
+    the in-memory reference implementation that ``iter_chunks`` must match.
+    """
+    chunks: List[str] = []
+    for p in _PARA_RE.split(text):
+        chunks.extend(_chunk_paragraph(p, max_chars))
     if not chunks and text.strip():
         chunks = [text.strip()[:max_chars]]
     return chunks
 
 
+def _advise(fd: int, advice: str) -> None:
+    """Best-effort posix_fadvise page-cache hint (no-op where unsupported)."""
+    flag = getattr(os, advice, None)
+    if flag is not None:
+        try:
+            os.posix_fadvise(fd, 0, 0, flag)
+        except OSError:
+            pass
+
+
+def iter_chunks(path: Path, max_chars: int = 600) -> Iterator[str]:
+    """Yield a file's chunks while reading it in READ_BLOCK-sized blocks.
+
+    Same output as ``split_chunks(path.read_text(...))``, but chunking
+    starts before the file has been fully read and only the open paragraph
+    is buffered. Once that paragraph is known to exceed ``max_chars`` its
+    complete sentences are packed into chunks as they arrive, so a file
+    with no blank lines (one big paragraph, e.g. a log) is held only up to
+    its longest sentence. Text with no sentence ends at all is a single
+    chunk in ``split_chunks`` too, and is still held whole.
+    """
+    # Universal newlines, like read_text(): "\r\n" and "\r" become "\n".
+    decoder = io.IncrementalNewlineDecoder(
+        codecs.getincrementaldecoder("utf-8")(errors="ignore"), translate=True
+    )
+    buf = ""
+    cur: Optional[str] = None  # open chunk while packing an oversized paragraph
+    with open(path, "rb") as f:
+        _advise(f.fileno(), "POSIX_FADV_SEQUENTIAL")
+        while True:
+            block = f.read(READ_BLOCK)
+            # A separator straddling two blocks can only begin inside the
+            # buffer's trailing whitespace, so rescan from there.
+            scan_from = len(buf)
+            while scan_from and buf[scan_from - 1].isspace():
+                scan_from -= 1
+            buf += decoder.decode(block, final=not block)
+            start = 0
+            for m in _PARA_RE.finditer(buf, scan_from):
+                yield from _close_paragraph(cur, buf[start:m.start()], max_chars)
+                cur = None
+                start = m.end()
+            if start:
+                buf, scan_from = buf[start:], 0
+            if not block:
+                break
+            if cur is None and len(buf.strip()) > max_chars:
+                buf, cur, scan_from = buf.lstrip(), "", 0
+            if cur is not None:
+                # A sentence is complete once the whitespace after it is
+                # followed by more text; the last run may continue next block.
+                sentences: List[str] = []
+                pos = 0
+                for m in _SENT_RE.finditer(buf, scan_from):
+                    if m.end() == len(buf):
+                        break
+                    sentences.append(buf[pos:m.start()])
+                    pos = m.end()
+                buf = buf[pos:]
+                out: List[str] = []
+                cur = _pack_sentences(cur, sentences, max_chars, out)
+                yield from out
+    yield from _close_paragraph(cur, buf, max_chars)
+
+
+def tokenize_chunks(
+    chunks: Iterable[str], vocab: Dict[str, int]
+) -> Iterator[Tuple[str, List[int]]]:
+    """Tokenize each chunk straight into vocab term ids as it arrives.
+
+    Fuses tokenize and vocabulary interning into one loop so ingestion
+    never materializes per-chunk token string lists. Unseen terms are added
+    to ``vocab`` with the next free id.
+    """
+    intern = vocab.setdefault
+    findall = WORD_RE.findall
+    for c in chunks:
+        yield c, [intern(w, len(vocab)) for w in findall(c.lower()) if w not in STOPWORDS]
+
+
+def spmv_cosine(
+    q_cols: array,
+    q_weights: array,
+    indptr: array,
+    indices: array,
+    data: array,
+    inv_norms: array,
+) -> Tuple[List[int], List[float]]:
+    """Score rows against a sparse query: ``(A @ q) / row_norms``.
+
+    Scatters each query column's postings into one preallocated dense score
+    list (plain list indexing, no per-row dict hashing). Only rows that
+    share a term with the query can score above zero, so just those rows
+    are returned (ascending) with their cosine scores; the row norms are
+    applied to them in a single C-level ``map``.
+    """
+    out = [0.0] * len(inv_norms)
+    touched = set()
+    for col, w in zip(q_cols, q_weights):
+        lo, hi = indptr[col], indptr[col + 1]
+        rows = indices[lo:hi]
+        touched.update(rows)
+        for r, v in zip(rows, data[lo:hi]):
+            out[r] += v * w
+    rows = sorted(touched)
+    return rows, list(map(mul, map(out.__getitem__, rows), map(inv_norms.__getitem__, rows)))
+
+
+def check_df_limits(min_df: Optional[int] = None, max_df: Optional[float] = None) -> None:
+    """Raise ValueError if a --min-df/--max-df value is out of range."""
+    if min_df is not None and min_df < 1:
+        raise ValueError("min-df must be at least 1")
+    if max_df is not None and not 0.0 < max_df <= 1.0:
+        raise ValueError("max-df must be in (0, 1]")
+
+
 class TfidfIndex:
-    def __init__(self):
+    """TF-IDF index stored as one sparse term-by-chunk matrix.
+
+    The matrix is packed column-wise into three flat buffers (``indptr``,
+    ``indices`` = chunk rows, ``data`` = raw term counts), so a query only
+    walks the postings of its own terms and the whole corpus costs three
+    Python objects however large the vocabulary. ``add_file`` appends new
+    postings to small per-term pending buffers; ``rebuild`` folds them into
+    the packed matrix and refreshes idf and row norms.
+
+    Counts are stored as uint32 rather than float tf: cosine similarity is
+    invariant to scaling a row, so the per-row ``1 / len(tokens)`` factor
+    cancels against the row norm and the scores are unchanged while the
+    postings take half the memory.
+
+    Terms whose document frequency falls outside ``[min_df, max_df * N]``
+    are pruned at rebuild time: their idf is zeroed, so they drop out of
+    row norms and queries never walk their postings.
+
+    Chunks are stored column-wise too: parallel ``chunk_doc``/``chunk_no``
+    arrays plus one UTF-8 ``text_blob`` sliced by ``text_offsets``. Queries
+    return integer row ids; use ``chunk_path``/``chunk_text`` to render them.
+    """
+
+    def __init__(self, min_df: int = 1, max_df: float = 1.0):
+        self.min_df = min_df
+        self.max_df = max_df
         self.docs: List[Dict[str, object]] = []  # {path, n_chunks}
-        self.chunks: List[Dict[str, object]] = []  # {doc_path, chunk_id, text, tokens, tf, vec, norm}
-        self.idf: Dict[str, float] = {}
+        self.chunk_doc: array = array("i")  # row -> index into docs
+        self.chunk_no: array = array("i")  # row -> chunk number within its doc
+        self.text_blob: bytearray = bytearray()  # all chunk texts, UTF-8
+        self.text_offsets: array = array("q", [0])  # row -> slice of text_blob
+        self.vocab: Dict[str, int] = {}
+        self.idf: List[float] = []
+        self.indptr: array = array("q", [0])  # column offsets into indices/data
+        self.indices: array = array("i")  # chunk (row) ids, ascending per column
+        self.data: array = array("I")  # term count in that row
+        # term id -> (rows, counts) appended since the last rebuild
+        self._pending: Dict[int, Tuple[array, array]] = {}
+        self.inv_norms: array = array("d")  # 1 / L2 norm of each tf-idf row
         self._dirty: bool = False  # track if rebuild needed
+        self._corpus_version: int = 0  # bumped on every rebuild
+        # (version, text, k, min_score) -> [(score, row)], least recent first
+        self._query_cache: OrderedDict = OrderedDict()
+        self._query_cache_size: int = 128
 
     # ----- Loading -----
     def add_file(self, path: Path) -> int:
-        text = path.read_text(encoding="utf-8", errors="ignore")
-        chunks = split_chunks(text)
-        for i, c in enumerate(chunks):
-            toks = tokenize(c)
-            tf: Dict[str, float] = {}
-            if toks:
-                inv = 1.0 / len(toks)
-                for t in toks:
-                    tf[t] = tf.get(t, 0.0) + inv
-            self.chunks.append({
-                "doc_path": str(path),
-                "chunk_id": i,
-                "text": c,
-                "tokens": toks,
-                "tf": tf,
-                "vec": {},
-                "norm": 0.0,
-            })
-        self.docs.append({"path": str(path), "n_chunks": len(chunks)})
+        """Index one file; on error the index is left exactly as it was."""
+        pending, vocab = self._pending, self.vocab
+        blob, offsets = self.text_blob, self.text_offsets
+        row0, v0, blob0 = self.n_chunks, len(vocab), len(blob)
+        n = 0
+        try:
+            for n, (c, ids) in enumerate(tokenize_chunks(iter_chunks(path), vocab), 1):
+                row = row0 + n - 1
+                for col, count in Counter(ids).items():
+                    entry = pending.get(col)
+                    if entry is None:
+                        entry = pending[col] = (array("i"), array("I"))
+                    entry[0].append(row)
+                    entry[1].append(count)
+                blob += c.encode("utf-8")
+                offsets.append(len(blob))
+        except BaseException:
+            self._rollback(row0, v0, blob0)
+            raise
+        self.chunk_doc.extend(repeat(len(self.docs), n))
+        self.chunk_no.extend(range(n))
+        self.docs.append({"path": str(path), "n_chunks": n})
         self._dirty = True
-        return len(chunks)
+        return n
+
+    def _rollback(self, row0: int, v0: int, blob0: int) -> None:
+        """Undo a partial add_file: drop rows >= row0 and terms >= v0."""
+        pending = self._pending
+        for col in list(pending):
+            rows, counts = pending[col]
+            keep = len(rows)
+            while keep and rows[keep - 1] >= row0:  # the file's rows are appended last
+                keep -= 1
+            if keep == 0:
+                del pending[col]
+            elif keep < len(rows):
+                del rows[keep:], counts[keep:]
+        for term in list(self.vocab)[v0:]:  # vocab keeps insertion order
+            del self.vocab[term]
+        del self.text_blob[blob0:]
+        del self.text_offsets[row0 + 1:]
+
+    @property
+    def n_chunks(self) -> int:
+        return len(self.chunk_doc)
+
+    def chunk_path(self, row: int) -> str:
+        return self.docs[self.chunk_doc[row]]["path"]
+
+    def chunk_text(self, row: int) -> str:
+        return self.text_blob[self.text_offsets[row]:self.text_offsets[row + 1]].decode("utf-8")
 
     def add_folder(self, folder: Path) -> Tuple[int, int]:
         files = sorted(
@@ -267,73 +420,143 @@ class TfidfIndex:
             nfiles += 1
         return nfiles, nchunks
 
+    def set_df_limits(
+        self, min_df: Optional[int] = None, max_df: Optional[float] = None
+    ) -> None:
+        """Set index-wide df limits; they re-prune every loaded chunk on rebuild."""
+        check_df_limits(min_df, max_df)
+        if min_df is not None:
+            self.min_df = min_df
+        if max_df is not None:
+            self.max_df = max_df
+        self._dirty = True
+
     # ----- Vectorization -----
+    def _merge_pending(self) -> None:
+        """Fold postings appended since the last rebuild into the packed matrix.
+
+        New chunks always get higher row ids, so appending a column's pending
+        rows after its packed ones keeps every column sorted.
+        """
+        old_ptr, old_idx, old_data = self.indptr, self.indices, self.data
+        n_old = len(old_ptr) - 1
+        pending = self._pending
+        indptr = array("q", [0])
+        indices = array("i")
+        data = array("I")
+        for col in range(len(self.vocab)):
+            if col < n_old:
+                lo, hi = old_ptr[col], old_ptr[col + 1]
+                indices += old_idx[lo:hi]
+                data += old_data[lo:hi]
+            entry = pending.get(col)
+            if entry is not None:
+                indices += entry[0]
+                data += entry[1]
+            indptr.append(len(indices))
+        self.indptr, self.indices, self.data = indptr, indices, data
+        self._pending = {}
+
     def rebuild(self) -> None:
+        """Pack pending postings and refresh idf and row norms.
+
+        Document frequency is just the length of each column, so idf is
+        O(vocab). Adding chunks changes N and therefore every idf, so row
+        norms are recomputed with one pass over the nonzeros.
+        """
         if not self._dirty:
             return
-        N = max(1, len(self.chunks))
-        df: Dict[str, int] = {}
-        for ch in self.chunks:
-            seen = set(ch["tokens"]) if ch["tokens"] else set()
-            for t in seen:
-                df[t] = df.get(t, 0) + 1
-        self.idf = {
-            t: math.log((1 + N) / (1 + df_t)) + 1.0
-            for t, df_t in df.items()
-        }
-        for ch in self.chunks:
-            vec: Dict[str, float] = {}
-            for t, tf in ch["tf"].items():
-                idf = self.idf.get(t)
-                if idf is None:
-                    continue
-                vec[t] = tf * idf
-            norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
-            ch["vec"] = vec
-            ch["norm"] = norm
+        if self._pending:
+            self._merge_pending()
+        indptr, indices, data = self.indptr, self.indices, self.data
+        N = max(1, self.n_chunks)
+        lo, hi = self.min_df, self.max_df * N
+        idf = [
+            math.log((1 + N) / (1 + df)) + 1.0 if lo <= df <= hi else 0.0
+            for df in map(sub, indptr[1:], indptr)
+        ]
+        sq = [0.0] * self.n_chunks
+        for col, w in enumerate(idf):
+            if not w:
+                continue  # pruned term
+            w2 = w * w
+            start, end = indptr[col], indptr[col + 1]
+            for r, v in zip(indices[start:end], data[start:end]):
+                sq[r] += v * v * w2
+        # Rows with no terms have no postings and always score 0; give them
+        # a unit norm so the conversion runs as one C-level map.
+        self.idf = idf
+        self.inv_norms = array("d", map(pow, [s or 1.0 for s in sq], repeat(-0.5)))
         self._dirty = False
+        self._corpus_version += 1
+        self._query_cache.clear()
 
     # ----- Query -----
     def query(
         self, text: str, k: int = 3, min_score: float = 0.05
-    ) -> List[Tuple[float, Dict[str, object]]]:
+    ) -> List[Tuple[float, int]]:
         if self._dirty:
             self.rebuild()
-        q_tokens = tokenize(text)
-        if not q_tokens or not self.chunks:
+        key = (self._corpus_version, text, k, min_score)
+        hit = self._query_cache.get(key)
+        if hit is None:
+            hit = self._query_rows(text, k, min_score)
+            self._query_cache[key] = hit
+            if len(self._query_cache) > self._query_cache_size:
+                self._query_cache.popitem(last=False)
+        else:
+            self._query_cache.move_to_end(key)
+        return list(hit)
+
+    def _query_rows(self, text: str, k: int, min_score: float) -> List[Tuple[float, int]]:
+        q_tokens = _tokenize_cached(text)
+        if not q_tokens or not self.n_chunks:
             return []
-        tf: Dict[str, float] = {}
-        inv = 1.0 / len(q_tokens)
-        for t in q_tokens:
-            tf[t] = tf.get(t, 0.0) + inv
-        qvec: Dict[str, float] = {}
-        for t, tfv in tf.items():
-            idf = self.idf.get(t)
-            if idf:
-                qvec[t] = tfv * idf
-        if not qvec:
+        # Query vector as parallel (term id, weight) arrays sorted by term id.
+        idf = self.idf
+        counts = Counter(c for c in map(self.vocab.get, q_tokens) if c is not None and idf[c])
+        if not counts:
             return []
-        qnorm = math.sqrt(sum(v * v for v in qvec.values())) or 1.0
-        scored: List[Tuple[float, Dict[str, object]]] = []
-        for ch in self.chunks:
-            vec = ch["vec"]
-            if not vec:
-                continue
-            dot = 0.0
-            small, large = (qvec, vec) if len(qvec) <= len(vec) else (vec, qvec)
-            for t, v in small.items():
-                if t in large:
-                    dot += v * large[t]
-            if dot == 0.0:
-                continue
-            score = dot / (qnorm * ch["norm"])
-            if score >= min_score:
-                scored.append((score, ch))
-        scored.sort(key=lambda x: x[0], reverse=True)
-        return scored[:k]
+        q_cols = array("i", sorted(counts))
+        q_weights = array("d", (counts[c] * idf[c] for c in q_cols))
+        qnorm = math.hypot(*q_weights) or 1.0
+
+        # Row weights are count * idf, so each column's idf is folded into q.
+        q_weights = array("d", (v * idf[c] / qnorm for c, v in zip(q_cols, q_weights)))
+        rows, scores = spmv_cosine(
+            q_cols, q_weights, self.indptr, self.indices, self.data, self.inv_norms
+        )
+
+        # Top-k selection over the candidate rows only: O(c log k), not a
+        # sort of the whole corpus. Ties keep row order.
+        top = heapq.nlargest(k, range(len(rows)), key=scores.__getitem__)
+        return [
+            (scores[i], rows[i]) for i in top
+            if scores[i] > 0.0 and scores[i] >= min_score
+        ]
 
 
 # ---------------- Bot ----------------
+_GROUP_OPEN_RE = re.compile(r"(?<!\\)\((?:\?P<\w+>|(?!\?))")
+
+
+def combine_intents(patterns: List) -> "re.Pattern":
+    """Join intent patterns into one alternation with a group per intent.
+
+    Alternatives are tried in list order, exactly like looping over the
+    patterns, so ``match(...).lastgroup`` (``"i<n>"``) names the first
+    intent that matches. Groups inside each pattern become non-capturing,
+    since their names repeat across intents. Keep the intents on the same
+    engine (stdlib ``re``) as this alternation, so a pattern it picks also
+    matches when re-run on its own.
+    """
+    alts = (
+        f"(?P<i{n}>{_GROUP_OPEN_RE.sub('(?:', p.pattern)})"
+        for n, p in enumerate(patterns)
+    )
+    return re.compile("|".join(alts), re.I)
+
+
 class Bot:
     def __init__(
         self,
@@ -346,7 +569,8 @@ class Bot:
         self.top_k = max(1, int(top_k))
         self.min_score = float(min_score)
         self.use_color = bool(use_color)
-        self.mem = MemoryStore()
+        self.mem = MemoryStore(MEMORY_DB)
+        self.mem.import_json(FACTS_FILE, TODO_FILE)
         self.start_ts = time.time()
         self.jokes = [
             "Why do programmers prefer dark mode? Because light attracts bugs.",
@@ -370,6 +594,7 @@ class Bot:
             (re.compile(r"^/memkeys$", re.I), self._intent_memkeys),
             (re.compile(r"^/memsearch\s+(?P<q>.+)$", re.I), self._intent_memsearch),
             (re.compile(r"^/forget\s+(?P<k>[\w\s-]{1,60})$", re.I), self._intent_forget),
+            (re.compile(r"^/export$", re.I), self._intent_export),
             # To-dos
             (re.compile(r"^(?:add|todo)\s+(?P<item>.+)$", re.I), self._intent_todo_add),
             (re.compile(r"^(?:list|show)\s+(?:todos?|tasks?)$", re.I), self._intent_todo_list),
@@ -386,6 +611,7 @@ class Bot:
             (re.compile(r"^joke$", re.I), self._intent_joke),
             (re.compile(r"^help$", re.I), self._intent_help),
         ]
+        self._intent_re = combine_intents([p for p, _ in self.intents])
 
     # ----- Color helpers -----
     def _ansi(self, code: str) -> str:
@@ -455,35 +681,38 @@ class Bot:
         ok = self.mem.forget(k)
         return "🗑️  Forgotten." if ok else f"❓ Nothing saved for {k!r}."
 
+    def _intent_export(self, *_args) -> str:
+        _write_json(FACTS_FILE, self.mem.items())
+        _write_json(TODO_FILE, [
+            {"text": text, "done": done, "ts": ts}
+            for text, done, ts in self.mem.todos()
+        ])
+        return f"📦 Exported memory to {FACTS_FILE.name} and {TODO_FILE.name} in ./data"
+
     # ----- To-do intents -----
     def _intent_todo_add(self, m: re.Match, _: str) -> str:
         item = m.group("item").strip()
-        todos = _read_json(TODO_FILE, [])
-        todos.append({"text": item, "done": False, "ts": time.time()})
-        _write_json(TODO_FILE, todos)
-        return f"Added to-do #{len(todos)}: {item}"
+        n = self.mem.todo_add(item)
+        return f"Added to-do #{n}: {item}"
 
     def _intent_todo_list(self, *_args) -> str:
-        todos = _read_json(TODO_FILE, [])
+        todos = self.mem.todos()
         if not todos:
             return "No to-dos yet. Add one with: add <task>"
         lines = ["To-dos:"]
-        for i, t in enumerate(todos, 1):
-            mark = "[x]" if t.get("done") else "[ ]"
-            lines.append(f"  {i:>2}. {mark} {t['text']}")
+        for i, (text, done, _ts) in enumerate(todos, 1):
+            mark = "[x]" if done else "[ ]"
+            lines.append(f"  {i:>2}. {mark} {text}")
         return "\n".join(lines)
 
     def _intent_todo_done(self, m: re.Match, _: str) -> str:
-        idx = int(m.group("idx")) - 1
-        todos = _read_json(TODO_FILE, [])
-        if 0 <= idx < len(todos):
-            todos[idx]["done"] = True
-            _write_json(TODO_FILE, todos)
-            return f"Marked to-do #{idx+1} as done."
+        idx = int(m.group("idx"))
+        if self.mem.todo_done(idx):
+            return f"Marked to-do #{idx} as done."
         return "Invalid index. Try: done 1"
 
     def _intent_todo_clear(self, *_args) -> str:
-        _write_json(TODO_FILE, [])
+        self.mem.todo_clear()
         return "Cleared all to-dos."
 
     # ----- Q&A intents -----
@@ -499,20 +728,47 @@ class Bot:
                 return c.resolve()
         return None
 
+    def _parse_df_options(self, raw: str) -> Tuple[str, Dict[str, float]]:
+        """Split --min-df/--max-df flags off a load argument and validate them.
+
+        Returns the bare path and the ``set_df_limits`` keyword arguments;
+        nothing is applied, so a bad path leaves the index untouched.
+        """
+        opts = {name.lower(): val for name, val in _DF_OPT_RE.findall(raw)}
+        limits = {}
+        if "min-df" in opts:
+            limits["min_df"] = int(opts["min-df"])
+        if "max-df" in opts:
+            limits["max_df"] = float(opts["max-df"])
+        check_df_limits(**limits)
+        return _DF_OPT_RE.sub("", raw), limits
+
     def _intent_load_file(self, m: re.Match, _: str) -> str:
-        target = self._resolve_for_load(m.group("file"))
+        try:
+            raw, limits = self._parse_df_options(m.group("file"))
+        except ValueError as e:
+            return f"Bad option ({e}). Usage: load <file> [--min-df=2] [--max-df=0.9]"
+        target = self._resolve_for_load(raw)
         if not target or not target.is_file() or target.suffix.lower() not in ALLOWED_SUFFIX:
             return "File not found or unsupported. Use .txt/.md/.log"
         n = self.index.add_file(target)
+        if limits:
+            self.index.set_df_limits(**limits)
         return f"Loaded {target.name} with {n} chunks. Ask with: ask <question>"
 
     def _intent_load_folder(self, m: re.Match, _: str) -> str:
-        folder = self._resolve_for_load(m.group("folder"))
+        try:
+            raw, limits = self._parse_df_options(m.group("folder"))
+        except ValueError as e:
+            return f"Bad option ({e}). Usage: load folder <path> [--min-df=2] [--max-df=0.9]"
+        folder = self._resolve_for_load(raw)
         if not folder or not folder.is_dir():
             return "Folder not found."
         nfiles, nchunks = self.index.add_folder(folder)
         if nfiles == 0:
             return "No .txt/.md/.log files found in that folder."
+        if limits:
+            self.index.set_df_limits(**limits)
         return f"Indexed {nfiles} files, {nchunks} chunks. Ask with: ask <question>"
 
     def _intent_doc_list(self, *_args) -> str:
@@ -533,10 +789,10 @@ class Bot:
         if not results:
             return f"No good matches (min score: {self.min_score}). Try rephrasing or loading more files."
         lines = [f"Top matches for: {q}"]
-        for idx, (score, ch) in enumerate(results):
+        for idx, (score, row) in enumerate(results):
             sty = self._score_style(score, idx)
-            name = Path(ch["doc_path"]).name
-            snippet = ch["text"].strip().replace("\n", " ")
+            name = Path(self.index.chunk_path(row)).name
+            snippet = self.index.chunk_text(row).strip().replace("\n", " ")
             if len(snippet) > 240:
                 snippet = snippet[:237] + "..."
             head = sty(f"- [{name}] ({score:.3f})")
@@ -553,7 +809,6 @@ class Bot:
         return random.choice(["Anytime!", "You got it.", "Happy to help."])
 
     def _intent_bye(self, *_args) -> str:
-        self.mem.close()
         return "Bye! (psst: your data is saved in ./data)"
 
     def _intent_time(self, *_args) -> str:
@@ -583,6 +838,8 @@ class Bot:
             "Commands:\n"
             "  load <file>              - add a .txt/.md/.log (./, script dir, or ./docs)\n"
             "  load folder <path>       - add all .txt/.md/.log in a folder\n"
+            "                             (--min-df=N / --max-df=F prune rare/common terms\n"
+            "                              in all loaded docs until 'clear docs')\n"
             "  list docs                - show loaded files\n"
             "  clear docs               - remove all indexed files\n"
             "  ask <question>           - search with TF-IDF + cosine\n"
@@ -594,6 +851,7 @@ class Bot:
             "  /memkeys                 - list memory keys\n"
             "  /memsearch <text>        - search memory\n"
             "  /forget <key>            - delete memory\n"
+            "  /export                  - dump memory + to-dos to JSON\n"
             "\n"
             "  add <task>               - add to-do\n"
             "  list todos               - list to-dos\n"
@@ -613,9 +871,12 @@ class Bot:
             return "Say something 🙂"
         if text.lower() in {"bye", "exit", "quit"}:
             return self._intent_bye()
-        for pattern, handler in self.intents:
+        hit = self._intent_re.match(text)
+        if hit:
+            # Re-run just the winning pattern so the handler sees its groups.
+            pattern, handler = self.intents[int(hit.lastgroup[1:])]
             m = pattern.match(text)
-            if m:
+            if m is not None:
                 try:
                     return handler(m, text)
                 except Exception as e:
@@ -659,6 +920,7 @@ def main(argv: List[str]):
                 break
     except KeyboardInterrupt:
         print("\nInterrupted. Bye!")
+    finally:
         bot.mem.close()
 
 
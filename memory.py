@@ -1,7 +1,9 @@
 # memory.py
+import json
 import sqlite3
+import threading
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 import time
 
 DEFAULT_DB = Path("data/memory.db")
@@ -25,57 +27,160 @@ CREATE TRIGGER IF NOT EXISTS memories_au AFTER UPDATE ON memories BEGIN
   INSERT INTO memories_fts(memories_fts, rowid, key, value) VALUES('delete', old.rowid, old.key, old.value);
   INSERT INTO memories_fts(rowid, key, value) VALUES (new.rowid, new.key, new.value);
 END;
+CREATE TABLE IF NOT EXISTS todos (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  text TEXT NOT NULL,
+  done INTEGER NOT NULL DEFAULT 0,
+  created_at REAL NOT NULL
+);
 """
 
+# PRAGMA user_version once the legacy facts.json/todos.json have been imported
+JSON_IMPORTED_VERSION = 1
+
 class MemoryStore:
     def __init__(self, db_path: Path = DEFAULT_DB):
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self.conn = sqlite3.connect(self.db_path)
+        # One connection shared by every thread (the web app serves requests
+        # on worker threads); the lock serializes access to it.
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._lock = threading.RLock()
         self.conn.execute("PRAGMA journal_mode=WAL;")
         self.conn.execute("PRAGMA foreign_keys=ON;")
         self.conn.executescript(SCHEMA)
         self.conn.commit()
 
     def remember(self, key: str, value: str) -> None:
-        key = key.strip()
-        value = value.strip()
-        now = time.time()
-        self.conn.execute(
-            "INSERT INTO memories(key, value, updated_at) VALUES(?,?,?) "
-            "ON CONFLICT(key) DO UPDATE SET value=excluded.value, updated_at=excluded.updated_at",
-            (key, value, now),
-        )
-        self.conn.commit()
+        with self._lock:
+            key = key.strip()
+            value = value.strip()
+            now = time.time()
+            self.conn.execute(
+                "INSERT INTO memories(key, value, updated_at) VALUES(?,?,?) "
+                "ON CONFLICT(key) DO UPDATE SET value=excluded.value, updated_at=excluded.updated_at",
+                (key, value, now),
+            )
+            self.conn.commit()
 
     def recall(self, key: str) -> Optional[str]:
-        cur = self.conn.execute("SELECT value FROM memories WHERE key=?", (key.strip(),))
-        row = cur.fetchone()
-        return row[0] if row else None
+        with self._lock:
+            cur = self.conn.execute("SELECT value FROM memories WHERE key=?", (key.strip(),))
+            row = cur.fetchone()
+            return row[0] if row else None
 
     def search(self, query: str, limit: int = 10) -> List[Tuple[str, str]]:
-        query = query.strip()
-        cur = self.conn.execute(
-            "SELECT key, value FROM memories_fts WHERE memories_fts MATCH ? LIMIT ?",
-            (query, limit),
-        )
-        rows = cur.fetchall()
-        if rows:
-            return rows
-        # fallback (LIKE) if FTS finds nothing
-        cur = self.conn.execute(
-            "SELECT key, value FROM memories WHERE key LIKE ? OR value LIKE ? LIMIT ?",
-            (f"%{query}%", f"%{query}%", limit),
-        )
-        return cur.fetchall()
+        with self._lock:
+            query = query.strip()
+            if not query:
+                return []
+            try:
+                cur = self.conn.execute(
+                    "SELECT key, value FROM memories_fts WHERE memories_fts MATCH ? LIMIT ?",
+                    (query, limit),
+                )
+                rows = cur.fetchall()
+                if rows:
+                    return rows
+            except sqlite3.OperationalError:
+                pass  # not valid FTS5 query syntax
+            # fallback (LIKE) if FTS finds nothing
+            cur = self.conn.execute(
+                "SELECT key, value FROM memories WHERE key LIKE ? OR value LIKE ? LIMIT ?",
+                (f"%{query}%", f"%{query}%", limit),
+            )
+            return cur.fetchall()
 
     def forget(self, key: str) -> bool:
-        cur = self.conn.execute("DELETE FROM memories WHERE key=?", (key.strip(),))
-        self.conn.commit()
-        return cur.rowcount > 0
+        with self._lock:
+            cur = self.conn.execute("DELETE FROM memories WHERE key=?", (key.strip(),))
+            self.conn.commit()
+            return cur.rowcount > 0
 
     def keys(self, limit: int = 200) -> List[str]:
-        cur = self.conn.execute(
-            "SELECT key FROM memories ORDER BY updated_at DESC LIMIT ?", (limit,)
-        )
-        return [r[0] for r in cur.fetchall()]
+        with self._lock:
+            cur = self.conn.execute(
+                "SELECT key FROM memories ORDER BY updated_at DESC LIMIT ?", (limit,)
+            )
+            return [r[0] for r in cur.fetchall()]
+
+    def items(self) -> Dict[str, str]:
+        with self._lock:
+            cur = self.conn.execute("SELECT key, value FROM memories ORDER BY key")
+            return dict(cur.fetchall())
+
+    # ----- To-dos -----
+    def todo_add(self, text: str) -> int:
+        """Append a to-do and return its 1-based position in the list."""
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO todos(text, done, created_at) VALUES(?, 0, ?)",
+                (text.strip(), time.time()),
+            )
+            self.conn.commit()
+            return self.conn.execute("SELECT COUNT(*) FROM todos").fetchone()[0]
+
+    def todos(self) -> List[Tuple[str, bool, float]]:
+        with self._lock:
+            cur = self.conn.execute("SELECT text, done, created_at FROM todos ORDER BY id")
+            return [(text, bool(done), ts) for text, done, ts in cur.fetchall()]
+
+    def todo_done(self, position: int) -> bool:
+        """Mark the to-do at 1-based ``position`` done; False if out of range."""
+        with self._lock:
+            if position < 1:
+                return False
+            row = self.conn.execute(
+                "SELECT id FROM todos ORDER BY id LIMIT 1 OFFSET ?", (position - 1,)
+            ).fetchone()
+            if row is None:
+                return False
+            self.conn.execute("UPDATE todos SET done=1 WHERE id=?", (row[0],))
+            self.conn.commit()
+            return True
+
+    def todo_clear(self) -> None:
+        with self._lock:
+            self.conn.execute("DELETE FROM todos")
+            self.conn.commit()
+
+    # ----- Legacy JSON -----
+    def import_json(self, facts_path: Path, todos_path: Path) -> None:
+        """One-time import of the old facts.json/todos.json files.
+
+        Runs only while the database's user_version is below
+        JSON_IMPORTED_VERSION. Existing memories win over facts.json.
+        """
+        with self._lock:
+            (version,) = self.conn.execute("PRAGMA user_version").fetchone()
+            if version >= JSON_IMPORTED_VERSION:
+                return
+            facts = _load_json(facts_path, {})
+            todos = _load_json(todos_path, [])
+            now = time.time()
+            with self.conn:
+                if isinstance(facts, dict):
+                    self.conn.executemany(
+                        "INSERT OR IGNORE INTO memories(key, value, updated_at) VALUES(?,?,?)",
+                        [(str(k).strip(), str(v).strip(), now) for k, v in facts.items()],
+                    )
+                if isinstance(todos, list):
+                    self.conn.executemany(
+                        "INSERT INTO todos(text, done, created_at) VALUES(?,?,?)",
+                        [
+                            (str(t.get("text", "")), int(bool(t.get("done"))), t.get("ts", now))
+                            for t in todos if isinstance(t, dict)
+                        ],
+                    )
+                self.conn.execute(f"PRAGMA user_version = {JSON_IMPORTED_VERSION}")
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
+
+
+def _load_json(path: Path, default):
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return default